@@ -1,6 +1,8 @@
 import platform
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Try to import cv2 and numpy with fallback
 try:
@@ -19,6 +21,17 @@ except ImportError:
 
 from .constants import MAX_RECORD_SECONDS
 
+# Codec tags are parsed once at import instead of on every writer/camera setup
+FOURCC = {name: cv2.VideoWriter_fourcc(*name) for name in ("MJPG", "XVID")} if CV2_AVAILABLE else {}
+
+WRITE_QUEUE_SIZE = 4  # Frames buffered between the recording loop and the encoder thread
+
+# Grabs that all return within this window were served from the driver's stale frame buffer
+STALE_GRAB_SEC = 0.004
+# Upper bound on extra grabs per frame (about a driver queue); backends such as DirectShow
+# return from grab() without waiting, so the time window alone may never close
+MAX_DRAIN_GRABS = 4
+
 # ---------- Camera detection & recorder ----------
 def detect_cameras(max_check: int = 12):
     if not CV2_AVAILABLE:
@@ -50,8 +63,13 @@ def detect_cameras(max_check: int = 12):
             except Exception as e:
                 cap = None
             if cap is not None and cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None:
+                # grab() proves the device delivers frames without decoding one, except on
+                # DirectShow, where grab() returns True without waiting for a frame
+                if backend == cv2.CAP_DSHOW:
+                    delivers = cap.read()[0]
+                else:
+                    delivers = cap.grab()
+                if delivers:
                     available.append(i)
                     opened = True
                 cap.release()
@@ -63,6 +81,150 @@ def detect_cameras(max_check: int = 12):
     print(f"[Detect] Total cameras detected: {len(available)} -> {available}")
     return available
 
+def _gstreamer_available():
+    try:
+        for line in cv2.getBuildInformation().splitlines():
+            if line.strip().startswith("GStreamer:"):
+                return "YES" in line
+    except Exception:
+        pass
+    return False
+
+def _hw_mjpeg_pipelines(index: int, width: int, height: int):
+    """GStreamer pipelines that decode a V4L2 MJPG stream on the GPU (Jetson, then VA-API)."""
+    src = f"v4l2src device=/dev/video{index} ! image/jpeg,width={width},height={height}"
+    sink = "videoconvert ! video/x-raw,format=BGR ! appsink drop=1 max-buffers=1"
+    return [
+        f"{src} ! nvv4l2decoder mjpeg=1 ! nvvidconv ! video/x-raw,format=BGRx ! {sink}",
+        f"{src} ! vaapijpegdec ! vaapipostproc format=bgrx ! {sink}",
+    ]
+
+def _opencl_available():
+    try:
+        return cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+    except Exception:
+        return False
+
+def _warm_up_opencl(src_sizes, width: int, height: int):
+    """Runs the recording loop's UMat resize once so OpenCL context creation and kernel
+    compilation happen before a timed recording instead of on its first frame."""
+    if not _opencl_available():
+        return
+    try:
+        u_combo = cv2.UMat(height, width * 2, cv2.CV_8UC3)
+        u_left = cv2.UMat(u_combo, (0, height), (0, width))
+        for src_w, src_h in src_sizes:
+            src = cv2.UMat(np.zeros((src_h, src_w, 3), dtype=np.uint8))
+            cv2.resize(src, (width, height), dst=u_left, interpolation=cv2.INTER_AREA)
+        u_combo.get()
+    except Exception as e:
+        print(f"[Init] OpenCL warm-up failed: {e}")
+
+def _open_video_writer(path: str, fourcc: int, fps: float, size):
+    """Opens a VideoWriter, asking FFmpeg for hardware-accelerated encoding where supported."""
+    # OpenCV >= 4.5.2: VIDEO_ACCELERATION_ANY uses NVENC/VAAPI/MFX if present, else software
+    if hasattr(cv2, "VIDEOWRITER_PROP_HW_ACCELERATION"):
+        try:
+            out = cv2.VideoWriter(path, cv2.CAP_FFMPEG, fourcc, fps, size,
+                                  [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            if out.isOpened():
+                return out
+            out.release()
+        except Exception:
+            pass
+    return cv2.VideoWriter(path, fourcc, fps, size)
+
+def _open_gstreamer_h264_writer(path: str, fps: float, size):
+    """Opens an H.264 VideoWriter through GStreamer, preferring hardware encoders over x264."""
+    # Colour conversion runs once in the pipeline; a short GOP keeps analyzer seeks cheap
+    encoders = [
+        ("NVENC (Jetson)", "videoconvert ! video/x-raw,format=BGRx ! nvvidconv ! "
+                           "video/x-raw(memory:NVMM),format=NV12 ! nvv4l2h264enc iframeinterval=15 ! h264parse"),
+        ("NVENC", "videoconvert ! video/x-raw,format=NV12 ! nvh264enc gop-size=15 ! h264parse"),
+        ("VA-API", "videoconvert ! video/x-raw,format=NV12 ! vaapih264enc keyframe-period=15 ! h264parse"),
+        ("x264", "videoconvert ! video/x-raw,format=I420 ! "
+                 "x264enc tune=zerolatency speed-preset=ultrafast key-int-max=15"),
+    ]
+    # The path includes the user-typed sample code; escape it for the quoted gst-launch value
+    location = path.replace("\\", "\\\\").replace('"', '\\"')
+    for name, encoder in encoders:
+        pipeline = f'appsrc ! {encoder} ! avimux ! filesink location="{location}"'
+        try:
+            out = cv2.VideoWriter(pipeline, cv2.CAP_GSTREAMER, 0, fps, size, True)
+            if out.isOpened():
+                print(f"[Loop] Recording with GStreamer {name} H.264 pipeline")
+                return out
+            out.release()
+        except Exception:
+            pass
+    return None
+
+class _CameraThread:
+    """Continuously grabs frames from one capture and keeps only the latest."""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.latest_frame = None
+        self.frame_id = 0
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._t = None
+
+    def start(self):
+        self._t = threading.Thread(target=self._run, daemon=True)
+        self._t.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                # OpenCV releases the GIL while waiting on the device.
+                # CAP_PROP_BUFFERSIZE is ignored by many backends, so drain buffered
+                # frames until a grab actually waits for the camera, then decode only that one.
+                t0 = time.perf_counter()
+                ok = self.cap.grab()
+                drained = 0
+                while (ok and drained < MAX_DRAIN_GRABS and time.perf_counter() - t0 < STALE_GRAB_SEC
+                       and not self._stop_event.is_set()):
+                    ok = self.cap.grab()
+                    drained += 1
+                if not ok:
+                    ret, frame = False, None
+                else:
+                    ret, frame = self.cap.retrieve()
+            except Exception:
+                # Fallback to read if grab/retrieve unsupported
+                try:
+                    ret, frame = self.cap.read()
+                except Exception:
+                    ret, frame = False, None
+
+            if not ret or frame is None:
+                # Back off instead of spinning while the device has nothing to give
+                time.sleep(0.005)
+                continue
+
+            with self._cond:
+                self.latest_frame = frame
+                self.frame_id += 1
+                self._cond.notify_all()
+
+    def read(self, last_id=0, timeout=1.0):
+        """Waits for a frame newer than last_id; returns (frame_id, frame) or (last_id, None)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.frame_id != last_id or self._stop_event.is_set(), timeout)
+            if self.frame_id == last_id:
+                return last_id, None
+            # retrieve() allocates a fresh array per frame, so handing out the reference is safe
+            return self.frame_id, self.latest_frame
+
+    def stop(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._t and self._t.is_alive() and self._t is not threading.current_thread():
+            self._t.join(timeout=1.0)
+
 class DualCameraRecorder:
     def __init__(self):
         self.cap1, self.cap2 = None, None
@@ -75,6 +237,7 @@ class DualCameraRecorder:
         self.demo_mode = False
         self.width = 0
         self.height = 0
+        self._cam_threads = []
 
     def initialize(self, width=640, height=480):
         self.width = width
@@ -99,7 +262,20 @@ class DualCameraRecorder:
         else:
             pref = [cv2.CAP_V4L2, cv2.CAP_ANY]
 
+        # MJPG is only requested at 720p+; on Linux try hardware JPEG decode first
+        use_hw_decode = (sysname == "linux" and self.height >= 720 and _gstreamer_available())
+
         def open_with_pref(idx):
+            if use_hw_decode:
+                for pipeline in _hw_mjpeg_pipelines(idx, self.width, self.height):
+                    try:
+                        cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+                        if cap.isOpened():
+                            print(f"[Init] Camera {idx}: hardware MJPG decode via GStreamer")
+                            return cap
+                        cap.release()
+                    except Exception:
+                        pass
             for backend in pref:
                 try:
                     cap = cv2.VideoCapture(idx, backend)
@@ -110,31 +286,57 @@ class DualCameraRecorder:
                     pass
             return None
 
+        def configure(c):
+            try:
+                # GStreamer pipelines already fix format and size in their caps
+                if c.getBackendName() == "GSTREAMER":
+                    return
+            except Exception:
+                pass
+            try:
+                # Request MJPG at higher res for better throughput
+                if self.height >= 720:
+                    c.set(cv2.CAP_PROP_FOURCC, FOURCC["MJPG"])
+                # Reduce camera internal buffering to lower latency (only a hint;
+                # the capture thread also drains stale frames itself)
+                try:
+                    c.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                except Exception:
+                    pass
+                c.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                c.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+                c.set(cv2.CAP_PROP_FPS, 30)
+            except Exception:
+                pass
+
+        def open_and_configure(idx):
+            c = open_with_pref(idx)
+            if c is not None and c.isOpened():
+                configure(c)
+            return c
+
         try:
-            self.cap1 = open_with_pref(cams[0])
-            self.cap2 = open_with_pref(cams[1])
+            if sysname.startswith("windows"):
+                # DirectShow keeps one process-wide device list that is not thread-safe,
+                # so open the cameras one after the other
+                self.cap1, self.cap2 = [open_and_configure(idx) for idx in cams[:2]]
+            else:
+                # Opening/configuring a camera blocks on the device (often ~1 s each, with
+                # the GIL released), so bring both up concurrently
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    self.cap1, self.cap2 = pool.map(open_and_configure, cams[:2])
             if not self.cap1 or not self.cap2 or not self.cap1.isOpened() or not self.cap2.isOpened():
                 self.release()
                 self.demo_mode = True
                 print("[Init] Falling back to demo mode (could not open two cameras).")
                 return True
-
+            # Cameras may stream at a size other than the one requested; warm up both scales
+            src_sizes = set()
             for c in (self.cap1, self.cap2):
-                try:
-                    # Request MJPG at higher res for better throughput
-                    if self.height >= 720:
-                        fourcc = cv2.VideoWriter_fourcc(*"MJPG")
-                        c.set(cv2.CAP_PROP_FOURCC, fourcc)
-                    # Reduce camera internal buffering to lower latency
-                    try:
-                        c.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                    except Exception:
-                        pass
-                    c.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-                    c.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-                    c.set(cv2.CAP_PROP_FPS, 30)
-                except Exception:
-                    pass
+                w = int(c.get(cv2.CAP_PROP_FRAME_WIDTH)) or self.width
+                h = int(c.get(cv2.CAP_PROP_FRAME_HEIGHT)) or self.height
+                src_sizes.add((w, h))
+            _warm_up_opencl(src_sizes, self.width, self.height)
             return True
         except Exception as e:
             print(f"[Init] Camera initialization error: {e}")
@@ -159,19 +361,27 @@ class DualCameraRecorder:
 
     def _loop(self):
         frames = []
-        start_time = time.time()
+        # Monotonic clock: immune to wall-clock adjustments mid-recording
+        start_time = time.monotonic()
+        deadline = start_time + MAX_RECORD_SECONDS
 
         combo_width = self.width * 2
         combo_height = self.height
         target_fps = 30  # Use a fixed, standard FPS for consistent playback speed
 
         if self.demo_mode:
-            while self.recording and not self._stop_requested and (time.time() - start_time) <= MAX_RECORD_SECONDS:
+            # Demo frames are solid colours that are never mutated, so each pattern value is
+            # rendered once and the same array is reused whenever that value comes round again
+            demo_frames = {}
+            while self.recording and not self._stop_requested and time.monotonic() <= deadline:
                 if NUMPY_AVAILABLE:
-                    frame = np.zeros((combo_height, combo_width, 3), dtype=np.uint8)
-                    elapsed = time.time() - start_time
+                    elapsed = time.monotonic() - start_time
                     pattern_val = int((elapsed * 50) % 255)
-                    frame[:, :, 0] = pattern_val
+                    frame = demo_frames.get(pattern_val)
+                    if frame is None:
+                        # Single write pass: broadcast one BGR pixel instead of zero-fill + channel write
+                        frame = np.full((combo_height, combo_width, 3), (pattern_val, 0, 0), dtype=np.uint8)
+                        demo_frames[pattern_val] = frame
                     frames.append(frame)
                     with self._lock:
                         self.frame_preview = frame
@@ -196,10 +406,12 @@ class DualCameraRecorder:
             try_codecs = ["MJPG", "XVID"] if prefer_mjpg else ["XVID", "MJPG"]
             out = None
             last_err = None
-            for c in try_codecs:
+            if _gstreamer_available():
+                out = _open_gstreamer_h264_writer(self._out_path, writer_fps, (combo_width, combo_height))
+            for c in ([] if out is not None else try_codecs):
                 try:
-                    fourcc = cv2.VideoWriter_fourcc(*c)
-                    out_try = cv2.VideoWriter(self._out_path, fourcc, writer_fps, (combo_width, combo_height))
+                    fourcc = FOURCC[c]
+                    out_try = _open_video_writer(self._out_path, fourcc, writer_fps, (combo_width, combo_height))
                     if out_try is not None and out_try.isOpened():
                         out = out_try
                         break
@@ -215,39 +427,81 @@ class DualCameraRecorder:
             preview_throttle = 3 if self.height >= 720 else 1
             frame_counter = 0
             # Keep playback in real time by writing duplicates or dropping frames based on elapsed time
-            last_t = time.time()
+            last_t = time.monotonic()
             write_accum = 0.0
             total_written = 0
 
-            while self.recording and not self._stop_requested and (time.time() - start_time) <= MAX_RECORD_SECONDS:
+            # Encode on a separate thread so VideoWriter.write doesn't stall capture
+            write_q = None
+            writer_t = None
+            if out is not None:
+                write_q = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+                writer_t = threading.Thread(target=self._write_loop, args=(out, write_q), daemon=True)
+                writer_t.start()
+
+            # Capture each camera on its own thread so USB I/O overlaps with processing
+            self._cam_threads = [_CameraThread(self.cap1).start(), _CameraThread(self.cap2).start()]
+            t1, t2 = self._cam_threads
+            id1 = id2 = 0
+            # Camera frame size is fixed once streaming, so decide on resizing from the first frames
+            need_resize1 = need_resize2 = None
+
+            # Both halves are written straight into one reused side-by-side buffer
+            combo = np.empty((combo_height, combo_width, 3), dtype=np.uint8)
+            combo_left = combo[:, :self.width]
+            combo_right = combo[:, self.width:]
+
+            # With OpenCL (T-API) the resize/merge runs on the GPU into a device-side buffer
+            use_ocl = _opencl_available()
+            if use_ocl:
+                u_combo = cv2.UMat(combo_height, combo_width, cv2.CV_8UC3)
+                u_left = cv2.UMat(u_combo, (0, combo_height), (0, self.width))
+                u_right = cv2.UMat(u_combo, (0, combo_height), (self.width, combo_width))
+
+            while self.recording and not self._stop_requested and time.monotonic() <= deadline:
                 if not self.cap1 or not self.cap2:
                     break
 
-                # Grab both first to reduce blocking between devices
-                try:
-                    self.cap1.grab()
-                    self.cap2.grab()
-                    r1, f1 = self.cap1.retrieve()
-                    r2, f2 = self.cap2.retrieve()
-                except Exception:
-                    # Fallback to read if grab/retrieve unsupported
-                    r1, f1 = self.cap1.read()
-                    r2, f2 = self.cap2.read()
+                id1, f1 = t1.read(id1)
+                id2, f2 = t2.read(id2)
 
-                if not (r1 and r2) or f1 is None or f2 is None:
+                if f1 is None or f2 is None:
                     continue
 
                 try:
-                    if f1.shape[1] != self.width or f1.shape[0] != self.height:
-                        f1 = cv2.resize(f1, (self.width, self.height))
-                    if f2.shape[1] != self.width or f2.shape[0] != self.height:
-                        f2 = cv2.resize(f2, (self.width, self.height))
-                    combo = np.hstack((f1, f2))
+                    if use_ocl:
+                        # Same-size resize is a plain device copy; get() downloads into a new array
+                        cv2.resize(cv2.UMat(f1), (self.width, self.height), dst=u_left, interpolation=cv2.INTER_AREA)
+                        cv2.resize(cv2.UMat(f2), (self.width, self.height), dst=u_right, interpolation=cv2.INTER_AREA)
+                        merged, merged_owned = u_combo.get(), True
+                    else:
+                        if need_resize1 is None:
+                            need_resize1 = f1.shape[:2] != (self.height, self.width)
+                            need_resize2 = f2.shape[:2] != (self.height, self.width)
+                        if not (need_resize1 or need_resize2):
+                            # Common case: one native C++ concat straight into the reused buffer
+                            cv2.hconcat([f1, f2], dst=combo)
+                        else:
+                            if need_resize1:
+                                cv2.resize(f1, (self.width, self.height), dst=combo_left, interpolation=cv2.INTER_AREA)
+                            else:
+                                np.copyto(combo_left, f1)
+                            if need_resize2:
+                                cv2.resize(f2, (self.width, self.height), dst=combo_right, interpolation=cv2.INTER_AREA)
+                            else:
+                                np.copyto(combo_right, f2)
+                        merged, merged_owned = combo, False
+
+                    # At most one copy of the reused CPU buffer per frame, shared read-only by
+                    # the writer queue, the preview and the buffering fallback
+                    snapshot = merged if merged_owned else None
 
                     if buffering_fallback:
-                        frames.append(combo)
+                        if snapshot is None:
+                            snapshot = merged.copy()
+                        frames.append(snapshot)
                     else:
-                        now_t = time.time()
+                        now_t = time.monotonic()
                         dt = max(0.0, now_t - last_t)
                         last_t = now_t
                         write_accum += writer_fps * dt
@@ -256,19 +510,29 @@ class DualCameraRecorder:
                             # Ensure we write at least one frame so the file isn't empty
                             count = 1
                         if count > 0:
-                            for _ in range(count):
-                                out.write(combo)
+                            if snapshot is None:
+                                snapshot = merged.copy()
+                            self._enqueue_write(write_q, snapshot, count)
                             write_accum -= count
                             total_written += count
 
                     if frame_counter % preview_throttle == 0:
+                        # The CPU buffer is overwritten next frame, so the preview needs the snapshot
+                        if snapshot is None:
+                            snapshot = merged.copy()
                         with self._lock:
-                            self.frame_preview = combo
+                            self.frame_preview = snapshot
                     frame_counter += 1
                 except Exception as e:
                     print(f"[Loop] Frame processing error: {e}")
                     break
 
+            self._stop_cam_threads()
+
+            if writer_t is not None:
+                write_q.put(None)
+                writer_t.join()
+
             # Release writer if we streamed frames
             if out is not None:
                 try:
@@ -283,7 +547,7 @@ class DualCameraRecorder:
         if frames and self._out_path and CV2_AVAILABLE:
             try:
                 # Measure actual FPS to avoid "fast playback" when capture is slower than target
-                elapsed = max(0.001, time.time() - start_time)
+                elapsed = max(0.001, time.monotonic() - start_time)
                 actual_fps = max(1.0, min(60.0, len(frames) / elapsed))
 
                 # Prefer MJPG at higher resolutions for lower CPU use; fallback to XVID
@@ -293,8 +557,8 @@ class DualCameraRecorder:
                 last_err = None
                 for c in try_codecs:
                     try:
-                        fourcc = cv2.VideoWriter_fourcc(*c)
-                        out_try = cv2.VideoWriter(self._out_path, fourcc, actual_fps, (combo_width, combo_height))
+                        fourcc = FOURCC[c]
+                        out_try = _open_video_writer(self._out_path, fourcc, actual_fps, (combo_width, combo_height))
                         if out_try is not None and out_try.isOpened():
                             out = out_try
                             break
@@ -319,6 +583,32 @@ class DualCameraRecorder:
             except Exception as e:
                 print(f"[Loop] Error writing demo file: {e}")
 
+    @staticmethod
+    def _write_loop(out, write_q):
+        while True:
+            item = write_q.get()
+            if item is None:
+                break
+            frame, count = item
+            try:
+                for _ in range(count):
+                    out.write(frame)
+            except Exception as e:
+                print(f"[Writer] Frame write error: {e}")
+
+    @staticmethod
+    def _enqueue_write(write_q, frame, count):
+        try:
+            write_q.put_nowait((frame, count))
+        except queue.Full:
+            # Drop the oldest frame but keep its slot count so the video stays real-time length
+            try:
+                _, old_count = write_q.get_nowait()
+                count += old_count
+            except queue.Empty:
+                pass
+            write_q.put_nowait((frame, count))
+
     def get_preview(self):
         with self._lock:
             if self.frame_preview is None:
@@ -332,8 +622,14 @@ class DualCameraRecorder:
         self._stop_requested = True
         self.recording = False
 
+    def _stop_cam_threads(self):
+        for t in self._cam_threads:
+            t.stop()
+        self._cam_threads = []
+
     def release(self):
         self.stop()
+        self._stop_cam_threads()
         try:
             if self.cap1:
                 self.cap1.release()
@@ -224,7 +224,7 @@ class EnhancedAnalyzer:
         frame_after_resized = cv2.resize(frame_after, target_size)
         
         # Combine frames side-by-side
-        combined = np.hstack([frame_before_resized, frame_after_resized])
+        combined = cv2.hconcat([frame_before_resized, frame_after_resized])
         
         # Normalize pixel values
         combined = combined.astype(np.float32) / 255.0
@@ -323,7 +323,7 @@ class EnhancedAnalyzer:
             filename = f"sample_{timestamp}.jpg"
             
             # Combine frames side-by-side for training
-            combined_frame = np.hstack([frame_before, frame_after])
+            combined_frame = cv2.hconcat([frame_before, frame_after])
             
             # Save the combined frame
             save_path = os.path.join(result_dir, filename)
@@ -3,6 +3,7 @@ Advanced Video Analysis Module
 Provides slow-motion replay, frame-by-frame analysis, and trajectory tracking.
 """
 
+import io
 import os
 import cv2
 import numpy as np
@@ -11,8 +12,29 @@ from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import threading
 import time
+from collections import Counter
 from typing import Optional, List, Tuple, Dict
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Low-res proxy track used for instant timeline scrubbing
+PROXY_STRIDE = 4    # Keep every Nth frame
+PROXY_WIDTH = 256   # Proxy frame width in pixels (height follows aspect ratio)
+
+class _ProxyTrack:
+    """Proxy frames for one video, with how many are ready and a stop flag for the builder."""
+    
+    def __init__(self, total_frames: int, frame_width: int, frame_height: int):
+        self.height = max(1, round(PROXY_WIDTH * frame_height / frame_width))
+        length = (total_frames + PROXY_STRIDE - 1) // PROXY_STRIDE
+        self.frames = np.empty((length, self.height, PROXY_WIDTH, 3), dtype=np.uint8)
+        self.count = 0
+        self.stop = threading.Event()
+
 class VideoAnalyzer:
     """Advanced video analysis tool with slow-motion and frame-by-frame capabilities."""
     
@@ -25,11 +47,18 @@ class VideoAnalyzer:
         self.total_frames = 0
         self.current_frame = 0
         self.fps = 30
+        self.frame_width = 0
+        self.frame_height = 0
         self.playing = False
         self.playback_speed = 1.0
+        self._frame_delay_ms = int(1000 / self.fps)
         self.frame_cache = {}
         self.trajectory_points = []
         self.analysis_markers = []
+        self._pending_scrub = None
+        self._scrub_scheduled = False
+        self._results_signature = None
+        self.proxy = None
         
     def show_analyzer(self, video_path: str):
         """Show the video analyzer window."""
@@ -56,14 +85,74 @@ class VideoAnalyzer:
                 
             self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
             self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+            self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self._update_frame_delay()
             self.current_frame = 0
             self.frame_cache = {}
             self.trajectory_points = []
             self.analysis_markers = []
             
+            self._start_proxy_build()
+            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to initialize video: {e}")
             
+    def _start_proxy_build(self):
+        """Start building the scrub proxy track in the background."""
+        self._stop_proxy_build()
+        if self.total_frames <= 0 or self.frame_width <= 0 or self.frame_height <= 0:
+            return
+        
+        # The track is created here and handed to the builder, so a builder still finishing
+        # for the previous video can only ever write into its own, discarded track
+        track = _ProxyTrack(self.total_frames, self.frame_width, self.frame_height)
+        self.proxy = track
+        threading.Thread(target=self._build_proxy, args=(track, self.video_path, self.total_frames),
+                         daemon=True).start()
+    
+    def _stop_proxy_build(self):
+        """Signal any running proxy build to stop and drop its track."""
+        if self.proxy:
+            self.proxy.stop.set()
+            self.proxy = None
+    
+    def _build_proxy(self, track: _ProxyTrack, video_path: str, total_frames: int):
+        """Decode every Nth frame sequentially into the track's low-res RGB buffer."""
+        # Separate capture so the UI thread can keep seeking self.cap
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                return
+            
+            # Decode and downscale into the same buffers every time instead of allocating per frame
+            frame = None
+            small = np.empty((track.height, PROXY_WIDTH, 3), dtype=np.uint8)
+            
+            for frame_num in range(total_frames):
+                if track.stop.is_set():
+                    return
+                    
+                # Sequential reads only; skipped frames are grabbed without decoding to BGR
+                if frame_num % PROXY_STRIDE:
+                    if not cap.grab():
+                        break
+                    continue
+                    
+                ret, frame = cap.read(frame)
+                if not ret:
+                    break
+                    
+                idx = frame_num // PROXY_STRIDE
+                cv2.resize(frame, (PROXY_WIDTH, track.height), dst=small, interpolation=cv2.INTER_AREA)
+                cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=track.frames[idx])
+                track.count = idx + 1
+                
+        except Exception as e:
+            print(f"Error building scrub proxy: {e}")
+        finally:
+            cap.release()
+    
     def _create_window(self):
         """Create the analyzer window."""
         self.window = tk.Toplevel(self.parent_app.root)
@@ -189,6 +278,7 @@ class VideoAnalyzer:
         
         ttk.Label(analysis_frame, text="Results:").pack(anchor="w", pady=(0, 5))
         self.results_text = tk.Text(analysis_frame, height=10, width=30, wrap=tk.WORD)
+        self._results_signature = None
         results_scroll = ttk.Scrollbar(analysis_frame, orient=tk.VERTICAL, command=self.results_text.yview)
         self.results_text.configure(yscrollcommand=results_scroll.set)
         
@@ -235,23 +325,18 @@ class VideoAnalyzer:
             
             self.current_frame = frame_num
             
-            # Convert to RGB and resize for display
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Add analysis overlays
-            frame_rgb = self._add_analysis_overlays(frame_rgb)
-            
-            # Convert to PhotoImage
-            frame_pil = Image.fromarray(frame_rgb)
+            # Add analysis overlays (also converts BGR to RGB)
+            frame_rgb = self._add_analysis_overlays(frame)
             
             # Scale to fit canvas while maintaining aspect ratio
             canvas_width = self.canvas.winfo_width()
             canvas_height = self.canvas.winfo_height()
             
             if canvas_width > 1 and canvas_height > 1:
-                frame_pil = self._scale_image(frame_pil, canvas_width, canvas_height)
+                frame_rgb = self._scale_image(frame_rgb, canvas_width, canvas_height)
             
-            self.photo = ImageTk.PhotoImage(frame_pil)
+            # Convert to PhotoImage
+            self.photo = ImageTk.PhotoImage(Image.fromarray(frame_rgb))
             
             # Clear canvas and display frame
             self.canvas.delete("all")
@@ -264,9 +349,34 @@ class VideoAnalyzer:
         except Exception as e:
             print(f"Error displaying frame: {e}")
     
-    def _scale_image(self, image: Image.Image, max_width: int, max_height: int) -> Image.Image:
+    def _display_proxy_frame(self, frame_num: int) -> bool:
+        """Display the nearest proxy frame; returns False if it isn't built yet."""
+        track = self.proxy
+        idx = frame_num // PROXY_STRIDE
+        if track is None or idx >= track.count:
+            return False
+            
+        frame_rgb = track.frames[idx]
+        
+        # Size the proxy like the full-res frame would be displayed
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        if canvas_width > 1 and canvas_height > 1:
+            scale = min(canvas_width / self.frame_width, canvas_height / self.frame_height, 1.0)
+            size = (max(1, int(self.frame_width * scale)), max(1, int(self.frame_height * scale)))
+            frame_rgb = cv2.resize(frame_rgb, size, interpolation=cv2.INTER_LINEAR)
+        
+        self.photo = ImageTk.PhotoImage(Image.fromarray(frame_rgb))
+        self.canvas.delete("all")
+        self.canvas.create_image(canvas_width//2, canvas_height//2, image=self.photo)
+        
+        self.current_frame = frame_num
+        self._update_info_displays()
+        return True
+    
+    def _scale_image(self, image: np.ndarray, max_width: int, max_height: int) -> np.ndarray:
         """Scale image to fit within given dimensions while maintaining aspect ratio."""
-        orig_width, orig_height = image.size
+        orig_height, orig_width = image.shape[:2]
         
         # Calculate scaling factor
         scale_x = max_width / orig_width
@@ -276,22 +386,30 @@ class VideoAnalyzer:
         if scale < 1.0:
             new_width = int(orig_width * scale)
             new_height = int(orig_height * scale)
-            return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            return cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
         
         return image
     
     def _add_analysis_overlays(self, frame: np.ndarray) -> np.ndarray:
-        """Add analysis overlays to frame."""
-        overlay_frame = frame.copy()
+        """Add analysis overlays to a BGR frame, returning an RGB copy."""
+        # Reverse the channels as part of the copy so BGR->RGB costs no extra pass
+        overlay_frame = frame[..., ::-1].copy()
+        self._draw_analysis_overlays(overlay_frame)
+        return overlay_frame
+    
+    def _draw_analysis_overlays(self, image, bgr: bool = False):
+        """Draw current-frame overlays in place onto an RGB (or BGR) ndarray or UMat."""
+        def color(rgb):
+            return rgb[::-1] if bgr else rgb
         
         # Draw trajectory points
         for i, point in enumerate(self.trajectory_points):
             if point['frame'] == self.current_frame:
-                cv2.circle(overlay_frame, (point['x'], point['y']), 5, (255, 0, 0), -1)
+                cv2.circle(image, (point['x'], point['y']), 5, color((255, 0, 0)), -1)
                 if i > 0:
                     prev_point = self.trajectory_points[i-1]
-                    cv2.line(overlay_frame, (prev_point['x'], prev_point['y']), 
-                            (point['x'], point['y']), (255, 0, 0), 2)
+                    cv2.line(image, (prev_point['x'], prev_point['y']), 
+                            (point['x'], point['y']), color((255, 0, 0)), 2)
         
         # Draw analysis markers
         for marker in self.analysis_markers:
@@ -300,16 +418,14 @@ class VideoAnalyzer:
                 marker_type = marker['type']
                 
                 if marker_type == 'impact':
-                    cv2.drawMarker(overlay_frame, (x, y), (0, 255, 0), 
+                    cv2.drawMarker(image, (x, y), color((0, 255, 0)), 
                                   markerType=cv2.MARKER_CROSS, markerSize=20, thickness=3)
-                    cv2.putText(overlay_frame, "IMPACT", (x+10, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    cv2.putText(image, "IMPACT", (x+10, y-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, color((0, 255, 0)), 2)
                 elif marker_type == 'deformation':
-                    cv2.rectangle(overlay_frame, (x-20, y-20), (x+20, y+20), (0, 0, 255), 2)
-                    cv2.putText(overlay_frame, "DEFORM", (x+25, y), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-        
-        return overlay_frame
+                    cv2.rectangle(image, (x-20, y-20), (x+20, y+20), color((0, 0, 255)), 2)
+                    cv2.putText(image, "DEFORM", (x+25, y), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, color((0, 0, 255)), 2)
     
     def _update_info_displays(self):
         """Update frame and time information."""
@@ -366,19 +482,17 @@ class VideoAnalyzer:
         if not self.playing:
             return
             
-        # Calculate frame delay based on speed
-        frame_delay = (1.0 / self.fps) / self.playback_speed
-        
         # Display next frame
         next_frame = self.current_frame + 1
-        if next_frame >= self.total_frames:
+        total_frames = self.total_frames
+        if next_frame >= total_frames:
             self._pause()
             return
             
         self._display_frame(next_frame)
         
         # Schedule next frame
-        self.window.after(int(frame_delay * 1000), self._playback_loop)
+        self.window.after(self._frame_delay_ms, self._playback_loop)
     
     def _prev_frame(self):
         """Go to previous frame."""
@@ -394,15 +508,35 @@ class VideoAnalyzer:
         """Handle speed control change."""
         self.playback_speed = self.speed_var.get()
         self.speed_label.config(text=f"{self.playback_speed:.1f}x")
+        self._update_frame_delay()
+    
+    def _update_frame_delay(self):
+        """Recompute the playback tick delay for the current fps and speed."""
+        self._frame_delay_ms = max(1, int(1000 / (self.fps * self.playback_speed)))
     
     def _on_timeline_change(self, event=None):
         """Handle timeline scrubber change."""
+        # Released: drop any queued proxy scrub and decode full-res
+        self._pending_scrub = None
         frame_num = int(self.timeline_var.get())
         self._display_frame(frame_num)
     
     def _on_timeline_drag(self, event=None):
         """Handle timeline dragging."""
-        self._on_timeline_change(event)
+        # Coalesce motion events: only the latest position is decoded once the UI is idle
+        self._pending_scrub = int(self.timeline_var.get())
+        if not self._scrub_scheduled:
+            self._scrub_scheduled = True
+            self.window.after_idle(self._do_scrub)
+    
+    def _do_scrub(self):
+        """Display the most recent scrub position."""
+        self._scrub_scheduled = False
+        if self._pending_scrub is None or not (self.window and self.window.winfo_exists()):
+            return
+        frame_num, self._pending_scrub = self._pending_scrub, None
+        if not self._display_proxy_frame(frame_num):
+            self._display_frame(frame_num)
     
     def _on_canvas_click(self, event):
         """Handle canvas click for analysis."""
@@ -494,24 +628,32 @@ class VideoAnalyzer:
     
     def _update_results_display(self):
         """Update the analysis results display."""
-        self.results_text.delete(1.0, tk.END)
+        # Points and markers are only ever appended or cleared, so their counts identify the content
+        signature = (len(self.trajectory_points), len(self.analysis_markers))
+        if signature == self._results_signature:
+            return
+        self._results_signature = signature
         
-        results = f"Analysis Results:\n\n"
-        results += f"Impact Markers: {len([m for m in self.analysis_markers if m['type'] == 'impact'])}\n"
-        results += f"Deformation Markers: {len([m for m in self.analysis_markers if m['type'] == 'deformation'])}\n"
-        results += f"Trajectory Points: {len(self.trajectory_points)}\n\n"
+        type_counts = Counter(m['type'] for m in self.analysis_markers)
+        
+        results = io.StringIO()
+        results.write("Analysis Results:\n\n")
+        results.write(f"Impact Markers: {type_counts['impact']}\n")
+        results.write(f"Deformation Markers: {type_counts['deformation']}\n")
+        results.write(f"Trajectory Points: {len(self.trajectory_points)}\n\n")
         
         if self.trajectory_points:
-            results += "Trajectory Analysis:\n"
+            results.write("Trajectory Analysis:\n")
             for i, point in enumerate(self.trajectory_points):
-                results += f"  Point {i+1}: Frame {point['frame']}, Time {point['timestamp']:.2f}s\n"
+                results.write(f"  Point {i+1}: Frame {point['frame']}, Time {point['timestamp']:.2f}s\n")
         
         if self.analysis_markers:
-            results += "\nMarkers:\n"
+            results.write("\nMarkers:\n")
             for i, marker in enumerate(self.analysis_markers):
-                results += f"  {marker['type'].title()} {i+1}: Frame {marker['frame']}, Time {marker['timestamp']:.2f}s\n"
+                results.write(f"  {marker['type'].title()} {i+1}: Frame {marker['frame']}, Time {marker['timestamp']:.2f}s\n")
         
-        self.results_text.insert(1.0, results)
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.insert(1.0, results.getvalue())
     
     def _export_frame(self):
         """Export current frame as image."""
@@ -529,12 +671,12 @@ class VideoAnalyzer:
                 self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
                 ret, frame = self.cap.read()
                 if ret:
-                    # Add analysis overlays
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frame_with_overlay = self._add_analysis_overlays(frame_rgb)
-                    frame_bgr = cv2.cvtColor(frame_with_overlay, cv2.COLOR_RGB2BGR)
+                    # Draw overlays straight onto the BGR frame as a UMat so OpenCV's
+                    # T-API can run them on OpenCL; download once for imwrite
+                    frame_umat = cv2.UMat(frame)
+                    self._draw_analysis_overlays(frame_umat, bgr=True)
                     
-                    cv2.imwrite(filename, frame_bgr)
+                    cv2.imwrite(filename, frame_umat.get())
                     messagebox.showinfo("Export Complete", f"Frame exported to:\n{filename}")
                     
         except Exception as e:
@@ -549,30 +691,60 @@ class VideoAnalyzer:
             filename = filedialog.asksaveasfilename(
                 title="Export Analysis Data",
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+                filetypes=[("JSON files", "*.json"), ("NumPy archive", "*.npz"), ("All files", "*.*")]
             )
             
             if filename:
-                analysis_data = {
-                    "video_path": self.video_path,
-                    "total_frames": self.total_frames,
-                    "fps": self.fps,
-                    "analysis_timestamp": time.time(),
-                    "trajectory_points": self.trajectory_points,
-                    "analysis_markers": self.analysis_markers
-                }
-                
-                with open(filename, 'w') as f:
-                    json.dump(analysis_data, f, indent=2)
+                if filename.lower().endswith(".npz"):
+                    self._export_analysis_npz(filename)
+                else:
+                    analysis_data = {
+                        "video_path": self.video_path,
+                        "total_frames": self.total_frames,
+                        "fps": self.fps,
+                        "analysis_timestamp": time.time(),
+                        "trajectory_points": self.trajectory_points,
+                        "analysis_markers": self.analysis_markers
+                    }
+                    
+                    if ORJSON_AVAILABLE:
+                        with open(filename, 'wb') as f:
+                            f.write(orjson.dumps(analysis_data,
+                                                 option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+                    else:
+                        with open(filename, 'w') as f:
+                            json.dump(analysis_data, f, indent=2)
                 
                 messagebox.showinfo("Export Complete", f"Analysis data exported to:\n{filename}")
                 
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export analysis: {e}")
     
+    def _export_analysis_npz(self, filename: str):
+        """Export analysis data as compressed column arrays."""
+        points = self.trajectory_points
+        markers = self.analysis_markers
+        np.savez_compressed(
+            filename,
+            video_path=np.array(self.video_path or ""),
+            total_frames=np.array(self.total_frames),
+            fps=np.array(self.fps),
+            analysis_timestamp=np.array(time.time()),
+            traj_frame=np.array([p['frame'] for p in points], dtype=np.int32),
+            traj_x=np.array([p['x'] for p in points], dtype=np.int32),
+            traj_y=np.array([p['y'] for p in points], dtype=np.int32),
+            traj_timestamp=np.array([p['timestamp'] for p in points], dtype=np.float64),
+            marker_frame=np.array([m['frame'] for m in markers], dtype=np.int32),
+            marker_x=np.array([m['x'] for m in markers], dtype=np.int32),
+            marker_y=np.array([m['y'] for m in markers], dtype=np.int32),
+            marker_type=np.array([m['type'] for m in markers], dtype=str),
+            marker_timestamp=np.array([m['timestamp'] for m in markers], dtype=np.float64)
+        )
+    
     def _on_close(self):
         """Handle window closing."""
         self.playing = False
+        self._stop_proxy_build()
         if self.cap:
             self.cap.release()
         if self.window:
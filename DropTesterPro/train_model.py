@@ -11,6 +11,9 @@ BATCH_SIZE = 32
 EPOCHS = 20 # Number of times the model sees the entire dataset
 TRAINING_DIR = "training_data"
 MODEL_SAVE_PATH = "bottle_drop_model.h5"
+TFLITE_SAVE_PATH = "bottle_drop_model_int8.tflite"
+SAVED_MODEL_DIR = "bottle_drop_saved_model"
+CALIBRATION_SAMPLES = 100 # Validation images used to calibrate int8 ranges
 
 def load_data(data_dir):
     """Loads images and labels from the training_data directory."""
@@ -59,36 +62,83 @@ def build_model():
         # Input layer: Normalize pixel values from 0-255 to 0-1
         tf.keras.layers.Rescaling(1./255, input_shape=(IMG_HEIGHT, IMG_WIDTH * 2, 3)),
         
-        # Convolutional layers to learn features
-        tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
+        # Depthwise-separable convolutional layers to learn features (far fewer
+        # multiplies than plain Conv2D, which matters on low-power tester hardware)
+        tf.keras.layers.SeparableConv2D(32, (3, 3), use_bias=False),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Activation('relu'),
         tf.keras.layers.MaxPooling2D(2, 2),
         
-        tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
+        tf.keras.layers.SeparableConv2D(64, (3, 3), use_bias=False),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Activation('relu'),
         tf.keras.layers.MaxPooling2D(2, 2),
         
-        tf.keras.layers.Conv2D(128, (3, 3), activation='relu'),
+        tf.keras.layers.SeparableConv2D(128, (3, 3), use_bias=False),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Activation('relu'),
         tf.keras.layers.MaxPooling2D(2, 2),
         
-        # Flatten the results to feed into a dense layer
-        tf.keras.layers.Flatten(),
+        # Pool each feature map to a single value instead of flattening
+        tf.keras.layers.GlobalAveragePooling2D(),
         
         # Dense (fully connected) layers
-        tf.keras.layers.Dense(512, activation='relu'),
+        tf.keras.layers.Dense(128, activation='relu'),
         tf.keras.layers.Dropout(0.5), # Dropout to prevent overfitting
         
         # Output layer: 1 neuron with sigmoid for binary classification (PASS/FAIL)
-        tf.keras.layers.Dense(1, activation='sigmoid')
+        # Kept in float32 so the sigmoid/loss stay numerically stable under mixed precision
+        tf.keras.layers.Dense(1, activation='sigmoid', dtype='float32')
     ])
     
-    model.compile(optimizer='adam',
+    optimizer = tf.keras.optimizers.Adam()
+    if tf.keras.mixed_precision.global_policy().name == 'mixed_float16':
+        # Scale the loss so small float16 gradients don't underflow to zero
+        optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
+    
+    model.compile(optimizer=optimizer,
                   loss='binary_crossentropy',
                   metrics=['accuracy'])
     
     return model
 
+def export_int8_tflite(model, calibration_images, output_path):
+    """Exports an int8-quantized TFLite copy of the model for fast inference."""
+    num_samples = min(CALIBRATION_SAMPLES, len(calibration_images))
+
+    def representative_dataset():
+        for i in range(num_samples):
+            yield [calibration_images[i:i+1].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    converter.inference_output_type = tf.uint8
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+def export_saved_model(model, output_dir):
+    """Exports a SavedModel whose serving signature is fixed to a single uint8 image pair."""
+    @tf.function(input_signature=[tf.TensorSpec([1, IMG_HEIGHT, IMG_WIDTH * 2, 3], tf.uint8)])
+    def infer(x):
+        return model(tf.cast(x, tf.float32), training=False)
+
+    tf.saved_model.save(model, output_dir, signatures={'serving_default': infer})
+
 if __name__ == "__main__":
     print("--- Starting AI Model Training ---")
     
+    # Mixed precision only pays off on GPUs with float16 tensor cores; on CPU it is slower
+    if tf.config.list_physical_devices('GPU'):
+        tf.keras.mixed_precision.set_global_policy('mixed_float16')
+        print("Mixed precision enabled (mixed_float16).")
+    
+    # Let XLA compile the fixed-shape training and inference graphs
+    tf.config.optimizer.set_jit(True)
+    
     if not os.path.exists(TRAINING_DIR):
         print(f"Error: Training directory '{TRAINING_DIR}' not found.")
         exit()
@@ -127,7 +177,26 @@ if __name__ == "__main__":
 
     # 5. Save Model
     print("\nStep 5: Saving the trained model...")
-    model.save(MODEL_SAVE_PATH)
+    # The policy is stored in every layer's config, so save a float32 copy for the CPU-only tester
+    if tf.keras.mixed_precision.global_policy().name != 'float32':
+        tf.keras.mixed_precision.set_global_policy('float32')
+        export_model = build_model()
+        export_model.set_weights(model.get_weights())
+    else:
+        export_model = model
+    export_model.save(MODEL_SAVE_PATH)
+    
+    try:
+        export_int8_tflite(export_model, X_val, TFLITE_SAVE_PATH)
+        print(f"Quantized int8 model saved to '{TFLITE_SAVE_PATH}'")
+    except Exception as e:
+        print(f"Warning: Could not export int8 TFLite model: {e}")
+    
+    try:
+        export_saved_model(export_model, SAVED_MODEL_DIR)
+        print(f"SavedModel with fixed-shape serving signature saved to '{SAVED_MODEL_DIR}'")
+    except Exception as e:
+        print(f"Warning: Could not export SavedModel: {e}")
     
     print(f"--- Training Complete! ---")
     print(f"Model saved successfully to '{MODEL_SAVE_PATH}'")